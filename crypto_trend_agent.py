@@ -4,21 +4,64 @@ CryptoTrendAgent - A lightweight AI research assistant for crypto traders.
 """
 
 import os
+import re
 import sys
 import sqlite3
 import json
 import time
+import atexit
+import hashlib
+import importlib.util
+import asyncio
+import threading
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
 import click
 from dotenv import load_dotenv
-import anthropic
+import orjson
+
+# Prefer the C-backed selectolax parser, falling back to BeautifulSoup.
+# selectolax.parser is gone in selectolax 1.0, so this import would quietly
+# fail and select the fallback; see the pin in requirements.txt.
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
 
 # Load environment variables
 load_dotenv()
 
+# Matches the outermost JSON object in a response that has extra prose around it
+JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Extracts the freshness lifetime from a Cache-Control header
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+def create_http_client():
+    """Create the shared async HTTP/2 client with a keep-alive connection pool."""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)
+    )
+
 # Database initialization
+def connect_db(db_path, check_same_thread=True):
+    """Open a SQLite connection with tuned per-connection settings."""
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
 def init_db():
     """Initialize the SQLite database with required tables."""
     db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'crypto_trends.db')
@@ -26,9 +69,13 @@ def init_db():
     # Ensure the data directory exists
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
-    conn = sqlite3.connect(db_path)
+    conn = connect_db(db_path)
     cursor = conn.cursor()
     
+    # WAL lets readers run concurrently with writers; the setting persists in the file
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA wal_autocheckpoint=1000")
+    
     # Create articles table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS articles (
@@ -42,7 +89,42 @@ def init_db():
         summary TEXT,
         sentiment TEXT,
         score REAL
-    )
+    ) STRICT
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_coin_date ON articles(coin, retrieval_date DESC)
+    ''')
+    
+    # Create fetched article cache table for conditional GETs
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS url_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    ) STRICT
+    ''')
+    
+    # Create exact-match LLM response cache table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        prompt_hash TEXT PRIMARY KEY,
+        response_json TEXT NOT NULL,
+        created_at REAL NOT NULL
+    ) STRICT
+    ''')
+    
+    # Create semantic summary cache table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS summary_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        coin TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        summary_json TEXT NOT NULL
+    ) STRICT
     ''')
     
     conn.commit()
@@ -54,7 +136,9 @@ def init_db():
 class BraveSearchClient:
     """Client for Brave Search API."""
     
-    def __init__(self):
+    def __init__(self, http, max_retries=3):
+        self.http = http
+        self.max_retries = max_retries
         self.api_key = os.getenv('BRAVE_API_KEY')
         if not self.api_key:
             raise ValueError("Brave API key not found in environment variables")
@@ -65,7 +149,7 @@ class BraveSearchClient:
             "X-Subscription-Token": self.api_key
         }
     
-    def search_crypto_news(self, coin, count=5):
+    async def search_crypto_news(self, coin, count=5):
         """Search for latest news about a cryptocurrency."""
         params = {
             "q": f"{coin} cryptocurrency news",
@@ -74,7 +158,21 @@ class BraveSearchClient:
             "freshness": "pd"  # Past day
         }
         
-        response = requests.get(self.base_url, headers=self.headers, params=params)
+        # Retry timeouts, connection errors, rate limits and server errors
+        # with exponential backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.http.get(self.base_url, headers=self.headers, params=params, timeout=5.0)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise Exception(f"Brave Search API error: {str(e)}")
+            else:
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+                if attempt == self.max_retries:
+                    break
+            
+            await asyncio.sleep(2 ** attempt)
         
         if response.status_code != 200:
             raise Exception(f"Brave Search API error: {response.status_code} - {response.text}")
@@ -85,114 +183,473 @@ class BraveSearchClient:
 class ArticleFetcher:
     """Handles fetching and extracting content from articles."""
     
-    def __init__(self):
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    # Only the title and paragraphs are needed, so the BeautifulSoup fallback
+    # skips building the rest of the tree
+    strainer = SoupStrainer(["title", "p"])
+    
+    # Stop downloading after this many bytes; article text sits near the top
+    # and the remainder of bloated pages is mostly scripts and ads
+    max_bytes = 256 * 1024
+    
+    def __init__(self, http, conn, db_lock, max_per_host=2):
+        self.http = http
+        self.conn = conn
+        self.db_lock = db_lock
+        # Per-host semaphores so concurrent fetches don't hammer a single site
+        self.max_per_host = max_per_host
+        self._host_semaphores = {}
+    
+    def _host_semaphore(self, url):
+        """Return the semaphore limiting concurrent fetches to the URL's host."""
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_semaphores[host]
+    
+    def _parse(self, html):
+        """Extract the title and text paragraphs from raw HTML bytes."""
+        if HTMLParser is not None:
+            tree = HTMLParser(html, detect_encoding=True)
+            title_node = tree.css_first("title")
+            title = title_node.text(strip=True) if title_node else None
+            paragraphs = [
+                text for node in tree.css("p")
+                # text(strip=True) would glue inline links to their neighbours
+                if len(text := node.text().strip()) > 50  # Skip short paragraphs
+            ]
+        else:
+            # Pass raw bytes so lxml detects the encoding itself
+            soup = BeautifulSoup(html, 'lxml', parse_only=self.strainer)
+            title = soup.title.get_text(strip=True) if soup.title else None
+            paragraphs = [
+                text for p in soup.find_all('p')
+                # get_text(strip=True) would glue inline links to their neighbours
+                if len(text := p.get_text().strip()) > 50  # Skip short paragraphs
+            ]
+        
+        return title or "No title found", paragraphs
+    
+    def _load_cached(self, url):
+        """Return the cached fetch for a URL as a dict, or None."""
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT etag, last_modified, title, content, expires_at FROM url_cache WHERE url = ?",
+                (url,)
+            )
+            row = cursor.fetchone()
+        if not row:
+            return None
+        etag, last_modified, title, content, expires_at = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "title": title,
+            "content": content,
+            "expires_at": expires_at
         }
     
-    def fetch_article(self, url):
+    def _store_cached(self, url, headers, title, content):
+        """Store a fetched article along with its validators and expiry."""
+        cache_control = headers.get("Cache-Control", "")
+        if "no-store" in cache_control:
+            return
+        max_age = MAX_AGE_RE.search(cache_control)
+        now = time.time()
+        expires_at = now + int(max_age.group(1)) if max_age and "no-cache" not in cache_control else now
+        
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+            INSERT OR REPLACE INTO url_cache (url, etag, last_modified, title, content, fetched_at, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (url, headers.get("ETag"), headers.get("Last-Modified"), title, content, now, expires_at))
+            self.conn.commit()
+    
+    async def fetch_article(self, url):
         """Fetch and extract content from an article URL."""
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            cached = self._load_cached(url)
+            if cached and cached["expires_at"] > time.time():
+                return {"title": cached["title"], "content": cached["content"]}, None
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Revalidate a stale cached copy with a conditional GET
+            headers = {}
+            if cached and cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached and cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
             
-            # Extract title
-            title = soup.title.text.strip() if soup.title else "No title found"
+            async with self._host_semaphore(url):
+                async with self.http.stream("GET", url, headers=headers) as response:
+                    if cached and response.status_code == 304:
+                        # Keep the old validators if the 304 doesn't repeat them
+                        validators = {
+                            "ETag": response.headers.get("ETag", cached["etag"]),
+                            "Last-Modified": response.headers.get("Last-Modified", cached["last_modified"]),
+                            "Cache-Control": response.headers.get("Cache-Control", "")
+                        }
+                        self._store_cached(url, validators, cached["title"], cached["content"])
+                        return {"title": cached["title"], "content": cached["content"]}, None
+                    
+                    response.raise_for_status()
+                    html = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        html += chunk
+                        if len(html) >= self.max_bytes:
+                            break
             
-            # Extract article content (this is a simple heuristic and may need refinement)
-            article_content = ""
-            paragraphs = soup.find_all('p')
-            for p in paragraphs:
-                if len(p.text.strip()) > 50:  # Skip short paragraphs
-                    article_content += p.text.strip() + "\n\n"
+            # Extract title and article content (this is a simple heuristic and may need refinement)
+            title, paragraphs = self._parse(bytes(html))
+            article_content = "\n\n".join(paragraphs)
             
             if not article_content:
                 return None, "Failed to extract content"
             
+            article_content = article_content[:10000]  # Limit content size
+            self._store_cached(url, response.headers, title, article_content)
+            
             return {
                 "title": title,
-                "content": article_content[:10000]  # Limit content size
+                "content": article_content
             }, None
             
         except Exception as e:
             return None, f"Error fetching article: {str(e)}"
 
+class ResponseCache:
+    """Cache of Claude analyses keyed by a hash of the exact coin and article content."""
+    
+    def __init__(self, conn, db_lock, ttl_days=None):
+        self.conn = conn
+        self.db_lock = db_lock
+        if ttl_days is None:
+            ttl_days = float(os.getenv('LLM_CACHE_TTL_DAYS', '7'))
+        self.ttl = ttl_days * 86400
+    
+    @staticmethod
+    def key(article_content, coin):
+        """Return the cache key for an article."""
+        return hashlib.sha256((coin.lower() + "\0" + article_content).encode()).hexdigest()
+    
+    def get(self, key):
+        """Return the cached analysis for a key, or None if missing or expired."""
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT response_json FROM llm_cache WHERE prompt_hash = ? AND created_at > ?",
+                (key, time.time() - self.ttl)
+            )
+            row = cursor.fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, key, analysis):
+        """Store an analysis under a key."""
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO llm_cache (prompt_hash, response_json, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(analysis), time.time())
+            )
+            self.conn.commit()
+
+class SemanticCache:
+    """Cache of Claude analyses keyed by article embeddings.
+    
+    Near-duplicate articles (the same story republished by several outlets)
+    reuse the stored analysis instead of calling Claude again. Disabled when
+    sentence-transformers is not installed.
+    """
+    
+    def __init__(self, conn, db_lock, threshold=0.92, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+        self.conn = conn
+        self.db_lock = db_lock
+        self.threshold = threshold
+        self.model_name = model_name
+        # sentence-transformers is optional and pulls in torch, so it is only
+        # imported when the first article is embedded
+        self.enabled = all(
+            importlib.util.find_spec(name) is not None
+            for name in ("numpy", "sentence_transformers")
+        )
+        # Guards loading and running the model, which happens on worker threads
+        self._model = None
+        self._model_lock = threading.Lock()
+        
+        # Cached embeddings are loaded into memory once. get() and put() only
+        # run on the event loop thread, so the matrix needs no lock
+        self._coins = []
+        self._summaries = []
+        self._embeddings = None
+        if self.enabled:
+            self._load()
+    
+    def _load(self):
+        """Load all cached embeddings from the database."""
+        import numpy as np
+        
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT coin, embedding, summary_json FROM summary_cache")
+            rows = cursor.fetchall()
+        
+        self._coins = [coin for coin, _, _ in rows]
+        self._summaries = [summary_json for _, _, summary_json in rows]
+        if rows:
+            self._embeddings = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows])
+    
+    def embed(self, article_content):
+        """Embed the start of an article, or return None if the cache is disabled."""
+        if not self.enabled:
+            return None
+        import numpy as np
+        
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            # Embeddings are normalized, so a dot product is the cosine similarity
+            return self._model.encode(article_content[:2048], normalize_embeddings=True).astype(np.float32)
+    
+    def get(self, embedding, coin):
+        """Return the cached analysis most similar to the embedding, if close enough."""
+        import numpy as np
+        
+        if self._embeddings is None:
+            return None
+        similarities = self._embeddings @ embedding
+        similarities[np.array(self._coins) != coin.lower()] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] <= self.threshold:
+            return None
+        return json.loads(self._summaries[best])
+    
+    def put(self, embedding, coin, analysis):
+        """Store an analysis under the given embedding."""
+        import numpy as np
+        
+        summary_json = json.dumps(analysis)
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "INSERT INTO summary_cache (coin, embedding, summary_json) VALUES (?, ?, ?)",
+                (coin.lower(), embedding.tobytes(), summary_json)
+            )
+            self.conn.commit()
+        
+        self._coins.append(coin.lower())
+        self._summaries.append(summary_json)
+        if self._embeddings is None:
+            self._embeddings = embedding[np.newaxis, :]
+        else:
+            self._embeddings = np.vstack([self._embeddings, embedding])
+
 class ClaudeClient:
     """Client for Anthropic's Claude API."""
     
-    def __init__(self):
+    # A 3-4 sentence summary doesn't need the whole article; cap the prompt size
+    max_content_chars = 4000
+    
+    def __init__(self, http, response_cache=None, semantic_cache=None, max_retries=3):
         self.api_key = os.getenv('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("Anthropic API key not found in environment variables")
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.http = http
+        self.base_url = "https://api.anthropic.com/v1/messages"
+        self.headers = {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+        self.max_retries = max_retries
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        
+        # Static prompt prefix, identical for every article so it can be cached.
+        # Only the coin name and article body go in the user message.
+        self.system_prompt = [
+            {
+                "type": "text",
+                "text": "You are a cryptocurrency analyst assistant that provides concise, factual summaries and sentiment analysis."
+            },
+            {
+                "type": "text",
+                "text": """You will be given an article about a cryptocurrency. Please summarize the key points in 3-4 sentences,
+focusing on market sentiment, price predictions, and notable events. Then, classify the overall sentiment
+as 'bullish', 'bearish', or 'neutral', and provide a confidence score from 0.0 to 1.0.
+
+Respond ONLY with raw JSON, no prose or code fences, in this format:
+{
+  "summary": "your summary here",
+  "sentiment": "bullish/bearish/neutral",
+  "score": 0.75
+}""",
+                "cache_control": {"type": "ephemeral"}
+            }
+        ]
+        
+        # Request fields shared by every call; only the messages vary
+        self.request_body = {
+            "model": "claude-3-haiku-20240307",
+            "max_tokens": 1000,
+            "temperature": 0,
+            "system": self.system_prompt
+        }
     
-    def summarize_article(self, article_content, coin):
-        """Summarize an article using Claude."""
-        prompt = f"""
-        The following is an article about {coin} cryptocurrency. Please summarize the key points in 3-4 sentences, 
-        focusing on market sentiment, price predictions, and notable events. Then, classify the overall sentiment 
-        as 'bullish', 'bearish', or 'neutral', and provide a confidence score from 0.0 to 1.0.
+    def _select_paragraphs(self, article_content):
+        """Keep the longest paragraphs up to max_content_chars, in their original order."""
+        if len(article_content) <= self.max_content_chars:
+            return article_content
         
-        Format your response as JSON:
-        {{
-          "summary": "your summary here",
-          "sentiment": "bullish/bearish/neutral",
-          "score": 0.75
-        }}
+        paragraphs = article_content.split("\n\n")
+        by_length = sorted(range(len(paragraphs)), key=lambda i: len(paragraphs[i]), reverse=True)
+        keep = []
+        total = 0
+        for i in by_length:
+            size = len(paragraphs[i]) + 2
+            if total + size <= self.max_content_chars:
+                keep.append(i)
+                total += size
         
-        Here's the article:
+        if not keep:
+            # Even the longest paragraph is over the limit
+            return paragraphs[by_length[0]][:self.max_content_chars]
+        return "\n\n".join(paragraphs[i] for i in sorted(keep))
+    
+    @staticmethod
+    def _validate_analysis(analysis):
+        """Return an error message if an analysis is malformed, otherwise None."""
+        if not isinstance(analysis, dict):
+            return "Claude's response is not a JSON object"
+        if not isinstance(analysis.get('summary'), str):
+            return "Claude's response has no summary"
+        if analysis.get('sentiment') not in ("bullish", "bearish", "neutral"):
+            return f"Claude's response has an invalid sentiment: {analysis.get('sentiment')!r}"
+        score = analysis.get('score')
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            return f"Claude's response has an invalid score: {score!r}"
+        return None
+    
+    async def summarize_article(self, article_content, coin):
+        """Summarize an article using Claude, reusing cached analyses where possible."""
+        article_content = self._select_paragraphs(article_content)
         
-        {article_content}
-        """
+        # Cheap exact match first, then semantic match
+        key = None
+        if self.response_cache:
+            key = self.response_cache.key(article_content, coin)
+            cached = self.response_cache.get(key)
+            if cached and not self._validate_analysis(cached):
+                return cached, None
         
+        embedding = None
+        if self.semantic_cache:
+            # Embedding is CPU-bound, so keep it off the event loop
+            embedding = await asyncio.to_thread(self.semantic_cache.embed, article_content)
+            if embedding is not None:
+                cached = self.semantic_cache.get(embedding, coin)
+                if cached and not self._validate_analysis(cached):
+                    if key:
+                        self.response_cache.put(key, cached)
+                    return cached, None
+        
+        # _call_claude only succeeds with a validated analysis, so nothing
+        # malformed reaches either cache
+        analysis, error = await self._call_claude(article_content, coin)
+        if not error:
+            if key:
+                self.response_cache.put(key, analysis)
+            if embedding is not None:
+                self.semantic_cache.put(embedding, coin, analysis)
+        return analysis, error
+    
+    async def _post_messages(self, body):
+        """POST a Messages API request, retrying rate limits and server errors with backoff."""
+        content = orjson.dumps(body)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.http.post(self.base_url, headers=self.headers, content=content, timeout=60.0)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code == 200:
+                    return orjson.loads(response.content)
+                if (response.status_code != 429 and response.status_code < 500) or attempt == self.max_retries:
+                    raise Exception(f"Claude API error: {response.status_code} - {response.text}")
+            
+            await asyncio.sleep(2 ** attempt)
+    
+    async def _call_claude(self, article_content, coin):
+        """Send an article to Claude and parse the JSON analysis."""
         try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=1000,
-                temperature=0,
-                system="You are a cryptocurrency analyst assistant that provides concise, factual summaries and sentiment analysis.",
-                messages=[
-                    {"role": "user", "content": prompt}
+            response = await self._post_messages({
+                **self.request_body,
+                "messages": [
+                    {"role": "user", "content": f"Article about {coin}:\n\n{article_content}"}
                 ]
-            )
+            })
             
             # Extract JSON from response
-            result_text = response.content[0].text
+            result_text = response["content"][0]["text"]
             
-            # Find JSON in the response
-            import re
-            json_match = re.search(r'({.*})', result_text, re.DOTALL)
-            if json_match:
-                result_json = json.loads(json_match.group(1))
-                return result_json, None
-            else:
-                # Fallback: try to parse the entire response as JSON
+            # Fast path: the response is usually pure JSON
+            try:
+                result_json = orjson.loads(result_text)
+            except orjson.JSONDecodeError:
+                # Fallback: find JSON embedded in the response
+                json_match = JSON_RE.search(result_text)
+                if not json_match:
+                    return None, "Failed to parse Claude's response as JSON"
                 try:
-                    result_json = json.loads(result_text)
-                    return result_json, None
-                except json.JSONDecodeError:
+                    result_json = orjson.loads(json_match.group(0))
+                except orjson.JSONDecodeError:
                     return None, "Failed to parse Claude's response as JSON"
             
+            # Never return (and so never cache) an analysis missing fields
+            error = self._validate_analysis(result_json)
+            if error:
+                return None, error
+            return result_json, None
+            
         except Exception as e:
             return None, f"Error calling Claude API: {str(e)}"
 
 class CryptoTrendAgent:
     """Main application class that orchestrates the crypto trend analysis."""
     
-    def __init__(self):
+    def __init__(self, use_cache=True):
         self.db_path = init_db()
-        self.brave_client = BraveSearchClient()
-        self.article_fetcher = ArticleFetcher()
-        self.claude_client = ClaudeClient()
+        
+        # One long-lived connection shared by the agent and its caches
+        self.conn = connect_db(self.db_path, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        atexit.register(self.conn.close)
+        
+        # One pooled HTTP client reused for every search and article fetch
+        self.http = create_http_client()
+        
+        self.brave_client = BraveSearchClient(self.http)
+        self.article_fetcher = ArticleFetcher(self.http, self.conn, self.db_lock)
+        if use_cache:
+            self.claude_client = ClaudeClient(
+                self.http,
+                response_cache=ResponseCache(self.conn, self.db_lock),
+                semantic_cache=SemanticCache(self.conn, self.db_lock)
+            )
+        else:
+            self.claude_client = ClaudeClient(self.http)
+    
+    async def aclose(self):
+        """Close the shared HTTP client."""
+        await self.http.aclose()
     
-    def run(self, coin, count=3):
+    async def run(self, coin, count=3, max_concurrency=4):
         """Run a complete analysis cycle for a cryptocurrency."""
         click.echo(f"🔍 Searching for latest {coin} news...")
         
         # Search for articles
-        search_results = self.brave_client.search_crypto_news(coin, count)
+        search_results = await self.brave_client.search_crypto_news(coin, count)
         
         if not search_results:
             click.echo("No results found.")
@@ -200,45 +657,87 @@ class CryptoTrendAgent:
         
         click.echo(f"Found {len(search_results)} articles.")
         
-        # Process each article
+        # Drop results without a URL and URLs repeated within the results
+        titles = {}
         for result in search_results:
             url = result.get('url')
-            title = result.get('title')
-            
-            # Check if article already exists in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id FROM articles WHERE url = ?", (url,))
-            existing = cursor.fetchone()
-            conn.close()
-            
-            if existing:
+            if url and url not in titles:
+                titles[url] = result.get('title')
+        
+        # Check which articles already exist in database with a single query
+        urls = list(titles)
+        placeholders = ",".join("?" * len(urls))
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT url FROM articles WHERE url IN ({placeholders})", urls)
+            existing = {row[0] for row in cursor.fetchall()}
+        
+        pending = []
+        for url, title in titles.items():
+            if url in existing:
                 click.echo(f"⏩ Skipping already processed article: {title}")
                 continue
-            
+            pending.append((url, title))
+        
+        if not pending:
+            return
+        
+        # Fetch and analyze all articles concurrently
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results = await asyncio.gather(*(
+            self._process_article(coin, url, title, semaphore)
+            for url, title in pending
+        ))
+        rows = [row for row in results if row]
+        
+        if not rows:
+            return
+        
+        # Store all results in database in a single transaction; the UNIQUE
+        # url index rejects articles stored since the existence check
+        stored = 0
+        with self.db_lock:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    cursor.execute("""
+                    INSERT OR IGNORE INTO articles (coin, url, title, retrieval_date, content, summary, sentiment, score)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, row)
+                    if cursor.rowcount == 0:
+                        click.echo(f"⏩ Duplicate, not stored: {row[2]}")
+                    else:
+                        stored += 1
+            except Exception:
+                # Don't leave the shared connection inside an open transaction
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+        click.echo(f"💾 Stored {stored} analyses")
+    
+    async def _process_article(self, coin, url, title, semaphore):
+        """Fetch and analyze one article, returning its database row or None."""
+        async with semaphore:
             click.echo(f"📄 Processing: {title}")
             
-            # Fetch and extract article content
-            article_data, error = self.article_fetcher.fetch_article(url)
-            if error:
-                click.echo(f"❌ {error}")
-                continue
-            
-            # Summarize and analyze sentiment
-            click.echo("🧠 Analyzing with Claude...")
-            analysis, error = self.claude_client.summarize_article(article_data['content'], coin)
-            if error:
-                click.echo(f"❌ {error}")
-                continue
-            
-            # Store results in database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # One failing article must not abort the others in the gather
             try:
-                cursor.execute("""
-                INSERT INTO articles (coin, url, title, retrieval_date, content, summary, sentiment, score)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+                # Fetch and extract article content
+                article_data, error = await self.article_fetcher.fetch_article(url)
+                if error:
+                    click.echo(f"❌ {title}: {error}")
+                    return None
+                
+                # Summarize and analyze sentiment
+                click.echo(f"🧠 Analyzing with Claude: {title}")
+                analysis, error = await self.claude_client.summarize_article(article_data['content'], coin)
+                if error:
+                    click.echo(f"❌ {title}: {error}")
+                    return None
+                
+                click.echo(f"✅ Analyzed {title}: {analysis['sentiment']} ({analysis['score']:.2f})")
+                return (
                     coin.lower(),
                     url,
                     article_data['title'],
@@ -247,21 +746,14 @@ class CryptoTrendAgent:
                     analysis['summary'],
                     analysis['sentiment'],
                     analysis['score']
-                ))
-                conn.commit()
-                click.echo(f"✅ Stored analysis: {analysis['sentiment']} ({analysis['score']:.2f})")
-            except sqlite3.IntegrityError:
-                click.echo("⚠️ Article already exists in database")
-            finally:
-                conn.close()
-            
-            # Slight delay to avoid rate limiting
-            time.sleep(1)
+                )
+            except Exception as e:
+                click.echo(f"❌ {title}: Error processing article: {str(e)}")
+                return None
     
     def show(self, coin, limit=5):
         """Show the latest sentiment analysis for a cryptocurrency."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         cursor.execute("""
         SELECT title, url, summary, sentiment, score, retrieval_date
@@ -272,7 +764,6 @@ class CryptoTrendAgent:
         """, (coin.lower(), limit))
         
         results = cursor.fetchall()
-        conn.close()
         
         if not results:
             click.echo(f"No data found for {coin}.")
@@ -291,10 +782,9 @@ class CryptoTrendAgent:
             click.echo(f"   Summary: {summary}")
             click.echo("\n" + "-" * 80 + "\n")
         
-        # Calculate overall sentiment
-        cursor = conn.cursor()
+        # Calculate overall sentiment and average confidence on the same cursor
         cursor.execute("""
-        SELECT sentiment, COUNT(*) as count
+        SELECT sentiment, COUNT(*) as count, AVG(score)
         FROM articles
         WHERE coin = ?
         GROUP BY sentiment
@@ -305,9 +795,9 @@ class CryptoTrendAgent:
         
         if sentiment_counts:
             click.echo(f"Overall sentiment distribution for {coin}:")
-            for sentiment, count in sentiment_counts:
+            for sentiment, count, avg_score in sentiment_counts:
                 sentiment_emoji = "🟢" if sentiment == "bullish" else "🔴" if sentiment == "bearish" else "⚪"
-                click.echo(f"{sentiment_emoji} {sentiment.capitalize()}: {count} articles")
+                click.echo(f"{sentiment_emoji} {sentiment.capitalize()}: {count} articles (avg confidence: {avg_score:.2f})")
 
 # CLI Interface
 @click.group()
@@ -318,17 +808,26 @@ def cli():
 @cli.command()
 @click.argument('coin')
 @click.option('--count', '-c', default=3, help='Number of articles to process (default: 3)')
-def run(coin, count):
+@click.option('--no-cache', is_flag=True, help='Always call Claude, ignoring cached analyses')
+def run(coin, count, no_cache):
     """Search and analyze latest news for a cryptocurrency."""
-    agent = CryptoTrendAgent()
-    agent.run(coin, count)
+    agent = CryptoTrendAgent(use_cache=not no_cache)
+    
+    async def run_agent():
+        try:
+            await agent.run(coin, count)
+        finally:
+            await agent.aclose()
+    
+    asyncio.run(run_agent())
 
 @cli.command()
 @click.argument('coin')
 @click.option('--limit', '-l', default=5, help='Number of results to show (default: 5)')
 def show(coin, limit):
     """Show stored sentiment analysis for a cryptocurrency."""
-    agent = CryptoTrendAgent()
+    # Listing stored results never consults the response caches
+    agent = CryptoTrendAgent(use_cache=False)
     agent.show(coin, limit)
 
 if __name__ == '__main__':